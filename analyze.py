@@ -0,0 +1,22 @@
+import argparse
+from general import analysis, tablebase, equilibriumfinder
+
+parser = argparse.ArgumentParser(prog="Generals", description="analyze recorded generals games")
+parser.add_argument('games', help="game log, one json list of [home, away] moves per line")
+parser.add_argument('-o', '--output', default="analysis.csv", help="csv, or .npz for numpy columns")
+parser.add_argument('-p', '--pieces', type=int, default=100)
+parser.add_argument('-w', '--wins', type=int, default=3)
+parser.add_argument('-t', '--table-file', default="states.txt")
+parser.add_argument('-c', '--cache-file', help="reuse move spaces solved by earlier runs")
+args = parser.parse_args()
+
+eq_finder = equilibriumfinder.create(cache_file=args.cache_file)
+table = tablebase.TableBase(eq_finder)
+tablebase.TableIO().load(table, args.table_file)
+table = table.with_win_condition(args.wins)
+
+analyzer = analysis.GameLogAnalyzer(table)
+columns = analyzer.analyze(analysis.GameLogReader(args.pieces).read(args.games))
+analyzer.save(columns, args.output)
+analyzer.dump_stats()
+eq_finder.close()
@@ -0,0 +1,29 @@
+import argparse
+import json
+from general import benchmark
+
+parser = argparse.ArgumentParser(prog="Generals", description="benchmark generals tablebase builds")
+parser.add_argument('-p', '--pieces', type=int, nargs='+', default=[3, 6, 9])
+parser.add_argument('-w', '--wins', type=int, nargs='+', default=[1, 2, 3])
+parser.add_argument('-a', '--adaptive', action="store_true", help="reorder finders by observed cost per shape")
+parser.add_argument('--no-cache', action="store_true", help="disable the in-memory equilibrium cache")
+parser.add_argument('-r', '--replay', help="time solving the move spaces in a timeout replay file instead")
+parser.add_argument('--replay-timeout', type=float, default=600, help="give up on a replayed solve after this many seconds")
+parser.add_argument('-o', '--output', help="write results as json for later comparison")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    finder_args = {"adaptive": args.adaptive}
+    if args.no_cache:
+        finder_args["cache_size"] = 0
+    if args.replay:
+        for result in benchmark.replay_move_spaces(args.replay, args.replay_timeout):
+            print("%s %s: %.3fs solved=%s timed_out=%s" % (result["finder"], result["shape"],
+                result["seconds"], result["solved"], result["timed_out"]))
+    else:
+        bench = benchmark.BuildBenchmark(args.pieces, args.wins, finder_args)
+        results = bench.run()
+        print(bench.report(results))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"results": results, "exponents": bench.exponents(results)}, f, indent=2)
@@ -0,0 +1,127 @@
+import csv
+import json
+import numpy
+from general import gameengine as ge
+
+
+class GameLogReader(object):
+    # One game per line, either a json list of [home, away] moves or an
+    # object {"pieces": 100, "moves": [[home, away], ...]}
+    def __init__(self, pieces=100):
+        self.pieces = pieces
+
+    def read(self, filename):
+        with open(filename, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield self._parse(json.loads(line))
+
+    def _parse(self, data):
+        if isinstance(data, dict):
+            return data.get("pieces", self.pieces), data["moves"]
+        return self.pieces, data
+
+
+class GameLogAnalyzer(object):
+    COLUMNS = ("game", "turn", "home_wins", "away_wins", "home_pieces", "away_pieces",
+            "home_move", "away_move", "home_eq_prob", "away_eq_prob",
+            "home_expected", "away_expected", "win_before", "win_after", "win_delta")
+
+    def __init__(self, table):
+        self.table = table
+        self.solved = {}
+        self.solves = 0
+        self.lookups = 0
+        self.skipped = []
+
+    def _equilibrium(self, state):
+        # only the distributions are kept, move space rows are looked up again per move
+        self.lookups += 1
+        if state not in self.solved:
+            self.solves += 1
+            move_space, home_dist, away_dist = self.table.equilibrium(state)
+            win_chance = home_dist.dot(move_space).dot(away_dist)
+            self.solved[state] = (home_dist, away_dist, win_chance)
+        return self.solved[state]
+
+    def _payoff(self, state, home_move, away_move):
+        # matches calc_move_space, which puts the score leader in [0,0]
+        if home_move == 0 and away_move == 0:
+            return state.score_leader.value
+        return self.table.lookup(state.move(home_move, away_move))
+
+    def _analyze_move(self, state, home_move, away_move):
+        home_dist, away_dist, win_before = self._equilibrium(state)
+        row = numpy.array([self._payoff(state, home_move, j) for j in range(away_dist.size)])
+        col = numpy.array([self._payoff(state, i, away_move) for i in range(home_dist.size)])
+        win_after = row[away_move]
+        if home_move == 0 and away_move == 0:
+            # the state is unchanged
+            win_after = win_before
+        return {
+            "home_wins": state.home_wins,
+            "away_wins": state.away_wins,
+            "home_pieces": state.home_pieces,
+            "away_pieces": state.away_pieces,
+            "home_move": home_move,
+            "away_move": away_move,
+            "home_eq_prob": home_dist[home_move],
+            "away_eq_prob": away_dist[away_move],
+            "home_expected": row.dot(away_dist),
+            "away_expected": 1 - home_dist.dot(col),
+            "win_before": win_before,
+            "win_after": win_after,
+            "win_delta": win_after - win_before,
+        }
+
+    def analyze_game(self, game_idx, moves, pieces=100):
+        if not self.table.covers(self.table.win_condition.first_to, pieces):
+            raise ValueError("Table does not cover game %s with %s pieces" % (game_idx, pieces))
+        game = ge.Game(ge.State.initial(pieces), self.table.win_condition)
+        rows = []
+        for turn, (home_move, away_move) in enumerate(moves):
+            if game.winner:
+                break
+            if not game.state.can_move(home=home_move, away=away_move):
+                raise ValueError("Illegal move %s:%s in game %s turn %s" % (home_move, away_move, game_idx, turn))
+            row = self._analyze_move(game.state, home_move, away_move)
+            row["game"] = game_idx
+            row["turn"] = turn
+            rows.append(row)
+            game = game.play_move(home_move, away_move)
+        return rows
+
+    def analyze(self, games):
+        # bad games are recorded in skipped so one broken log does not lose the batch
+        columns = dict((c, []) for c in self.COLUMNS)
+        for game_idx, (pieces, moves) in enumerate(games):
+            try:
+                rows = self.analyze_game(game_idx, moves, pieces)
+            except ValueError as e:
+                print("Skipping game %s: %s" % (game_idx, e))
+                self.skipped.append(game_idx)
+                continue
+            for row in rows:
+                for c in self.COLUMNS:
+                    columns[c].append(row[c])
+        return dict((c, numpy.asarray(vals)) for c, vals in columns.items())
+
+    def save(self, columns, filename):
+        if filename.endswith(".npz"):
+            numpy.savez_compressed(filename, **columns)
+            return
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            for row in zip(*(columns[c] for c in self.COLUMNS)):
+                writer.writerow([self._format(v) for v in row])
+
+    def _format(self, val):
+        if isinstance(val, (float, numpy.floating)):
+            return "%.4f" % (val, )
+        return str(val)
+
+    def dump_stats(self):
+        print("Analyzed %s moves with %s unique states solved, skipped %s games" % (
+            self.lookups, self.solves, len(self.skipped)))
@@ -0,0 +1,194 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import numpy
+from general import tablebase, equilibriumfinder
+
+
+class TimingFinder(equilibriumfinder.UniformMoveFinder):
+    def __init__(self, finder):
+        self.finder = finder
+        self.seconds = 0.0
+        self.calls = 0
+
+    def name(self):
+        return self.finder.name()
+
+    def move_distribution(self, move_space):
+        ts = time.time()
+        try:
+            return self.finder.move_distribution(move_space)
+        finally:
+            self.seconds += time.time() - ts
+            self.calls += 1
+
+    def dump_stats(self):
+        self.finder.dump_stats()
+
+    def close(self):
+        self.finder.close()
+
+
+class TimedTableBase(tablebase.TableBase):
+    def __init__(self, eq_engine, win_at=4):
+        super().__init__(eq_engine, win_at)
+        self.move_space_seconds = 0.0
+
+    def calc_move_space(self, state, win_normalized=False, compress=True):
+        ts = time.time()
+        try:
+            return super().calc_move_space(state, win_normalized, compress)
+        finally:
+            self.move_space_seconds += time.time() - ts
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_build(pieces, wins, finder_args=None, measure_rss=True):
+    finder = TimingFinder(equilibriumfinder.create(**(finder_args or {})))
+    table = TimedTableBase(finder, wins)
+    ts = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tablebase.TableBuilder(table).fill_to_pieces(pieces, wins)
+    wall = time.time() - ts
+    finder.close()
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "states.txt")
+        tablebase.TableIO().save(table, filename)
+        file_size = os.path.getsize(filename)
+    states = len(table.table)
+    # ru_maxrss is a process-wide high-water mark, only meaningful for a fresh process
+    peak_rss = _peak_rss_mb() if measure_rss else None
+    return {
+        "pieces": pieces,
+        "wins": wins,
+        "wall_s": wall,
+        "states": states,
+        "states_per_s": states / wall if wall > 0 else float("inf"),
+        "peak_rss_mb": peak_rss,
+        "move_space_s": table.move_space_seconds,
+        "finder_s": finder.seconds,
+        "finder_calls": finder.calls,
+        "file_bytes": file_size,
+    }
+
+
+REPLAY_FINDERS = {
+    "NashSupportFinder": equilibriumfinder.NashSupportFinder,
+    "NashVertexFinder": equilibriumfinder.NashVertexFinder,
+    "NashHowsonFinder": equilibriumfinder.NashHowsonFinder,
+    "NashHowsonLexFinder": equilibriumfinder.NashHowsonLexFinder,
+    "MinimizeApproxFinder": equilibriumfinder.MinimizeApproxFinder,
+}
+
+
+def replay_finder(name):
+    noisy = "NoisyMoveFinder("
+    if name.startswith(noisy) and name.endswith(")"):
+        return equilibriumfinder.NoisyMoveFinder(replay_finder(name[len(noisy):-1]))
+    if name not in REPLAY_FINDERS:
+        raise ValueError("Can not replay unknown finder %s" % (name, ))
+    return REPLAY_FINDERS[name]()
+
+
+def replay_move_spaces(filename, timeout=600):
+    # re-solves move spaces logged by TimeoutFinder with the finder that timed out
+    guarded = {}
+    results = []
+    try:
+        with open(filename, "r") as f:
+            for line in f:
+                data = json.loads(line)
+                if data["finder"] not in guarded:
+                    guarded[data["finder"]] = equilibriumfinder.TimeoutFinder(replay_finder(data["finder"]), timeout)
+                finder = guarded[data["finder"]]
+                move_space = numpy.asarray(data["move_space"], dtype="float32")
+                timeouts = finder.timeouts
+                ts = time.time()
+                moves = finder.move_distribution(move_space)
+                results.append({
+                    "finder": data["finder"],
+                    "shape": list(move_space.shape),
+                    "seconds": time.time() - ts,
+                    "solved": bool(moves),
+                    "timed_out": finder.timeouts > timeouts,
+                })
+    finally:
+        for finder in guarded.values():
+            finder.close()
+    return results
+
+
+def _run_build_star(args):
+    return run_build(*args)
+
+
+class BuildBenchmark(object):
+    COLUMNS = ("pieces", "wins", "wall_s", "states", "states_per_s", "peak_rss_mb",
+            "move_space_s", "finder_s", "finder_calls", "file_bytes")
+
+    def __init__(self, pieces, wins, finder_args=None, isolate=True):
+        self.pieces = sorted(pieces)
+        self.wins = sorted(wins)
+        self.finder_args = finder_args
+        self.isolate = isolate
+
+    def _run(self, pieces, wins):
+        if not self.isolate:
+            return run_build(pieces, wins, self.finder_args, measure_rss=False)
+        # a fresh process per run keeps peak RSS and caches per configuration
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1) as pool:
+            return pool.apply(_run_build_star, ((pieces, wins, self.finder_args, True), ))
+
+    def run(self):
+        results = []
+        for wins in self.wins:
+            for pieces in self.pieces:
+                print("Benchmarking pieces=%s wins=%s" % (pieces, wins))
+                results.append(self._run(pieces, wins))
+        return results
+
+    @staticmethod
+    def growth_exponent(xs, ys):
+        xs = numpy.asarray(xs, dtype=float)
+        ys = numpy.asarray(ys, dtype=float)
+        usable = (xs > 0) & (ys > 0)
+        if numpy.sum(usable) < 2:
+            return None
+        slope, _ = numpy.polyfit(numpy.log(xs[usable]), numpy.log(ys[usable]), 1)
+        return float(slope)
+
+    def exponents(self, results):
+        fits = {}
+        for wins in self.wins:
+            rows = [r for r in results if r["wins"] == wins]
+            pieces = [r["pieces"] for r in rows]
+            fits[wins] = {
+                "wall_s": self.growth_exponent(pieces, [r["wall_s"] for r in rows]),
+                "states": self.growth_exponent(pieces, [r["states"] for r in rows]),
+            }
+        return fits
+
+    def report(self, results):
+        lines = ["\t".join(self.COLUMNS)]
+        for r in results:
+            lines.append("\t".join(self._format(r[c]) for c in self.COLUMNS))
+        lines.append("")
+        for wins, fit in sorted(self.exponents(results).items()):
+            lines.append("wins=%s: wall time ~ pieces^%s, states ~ pieces^%s" % (
+                wins, self._format(fit["wall_s"]), self._format(fit["states"])))
+        return "\n".join(lines)
+
+    def _format(self, val):
+        if isinstance(val, float):
+            return "%.3f" % (val, )
+        return str(val)
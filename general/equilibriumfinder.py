@@ -2,6 +2,11 @@ import numpy
 import nashpy
 from nashpy.algorithms.lemke_howson_lex import lemke_howson_lex
 from scipy import optimize
+from collections import OrderedDict
+import hashlib
+import json
+import multiprocessing
+import shelve
 import time
 
 class UniformMoveFinder(object):
@@ -22,6 +27,9 @@ class UniformMoveFinder(object):
     def dump_stats(self):
         pass
 
+    def close(self):
+        pass
+
 
 class SequentialMoveFinder(UniformMoveFinder):
     def __init__(self, *finders):
@@ -39,6 +47,91 @@ class SequentialMoveFinder(UniformMoveFinder):
         print("Finder invocations:")
         for i, finder, stat in zip(range(len(self.finders)), self.finders, self.stats):
             print("%s, %s: %s" % (i, finder.name(), stat))
+        for finder in self.finders:
+            finder.dump_stats()
+
+    def close(self):
+        for finder in self.finders:
+            finder.close()
+
+class AdaptiveMoveFinder(SequentialMoveFinder):
+    # Leads with the finder with the lowest observed time-to-solution for the
+    # shape bucket, falling back to the remaining finders in original order.
+    # The optional fallback is never ranked and always tried last.
+    _ATTEMPTS = 0
+    _SUCCESSES = 1
+    _SECONDS = 2
+
+    def __init__(self, *finders, fallback=None, min_samples=10, explore_every=50):
+        self.ranked = len(finders)
+        if fallback is not None:
+            finders = finders + (fallback, )
+        super().__init__(*finders)
+        self.min_samples = min_samples
+        self.explore_every = explore_every
+        self.buckets = {}
+        self._calls = {}
+
+    def name(self):
+        return "Adaptive(%s)" % (", ".join(f.name() for f in self.finders), )
+
+    def _bucket(self, move_space):
+        return tuple(int(dim).bit_length() for dim in move_space.shape)
+
+    def _bucket_stats(self, bucket):
+        if bucket not in self.buckets:
+            self.buckets[bucket] = numpy.zeros((len(self.finders), 3))
+            self._calls[bucket] = 0
+        return self.buckets[bucket]
+
+    def _expected_costs(self, stats):
+        attempts = stats[:, self._ATTEMPTS]
+        successes = stats[:, self._SUCCESSES]
+        costs = numpy.full((len(self.finders), ), numpy.inf)
+        known = (attempts >= self.min_samples) & (successes > 0)
+        known[self.ranked:] = False
+        costs[known] = stats[known, self._SECONDS] / successes[known]
+        return costs
+
+    def finder_order(self, bucket):
+        stats = self._bucket_stats(bucket)
+        order = list(range(self.ranked))
+        fallback = list(range(self.ranked, len(self.finders)))
+        calls = self._calls[bucket]
+        if calls < self.min_samples or calls % self.explore_every == 0:
+            return order + fallback
+        costs = self._expected_costs(stats)
+        if numpy.isinf(costs).all():
+            return order + fallback
+        lead = int(numpy.argmin(costs))
+        hopeless = [i for i in order if i != lead and
+                stats[i, self._ATTEMPTS] >= self.min_samples and stats[i, self._SUCCESSES] == 0]
+        rest = [i for i in order if i != lead and i not in hopeless]
+        return [lead] + rest + hopeless + fallback
+
+    def move_distribution(self, move_space):
+        bucket = self._bucket(move_space)
+        order = self.finder_order(bucket)
+        stats = self.buckets[bucket]
+        self._calls[bucket] += 1
+        for i in order:
+            ts = time.time()
+            moves = self.finders[i].move_distribution(move_space)
+            stats[i, self._SECONDS] += time.time() - ts
+            stats[i, self._ATTEMPTS] += 1
+            if moves:
+                stats[i, self._SUCCESSES] += 1
+                self.stats[i] += 1
+                return moves
+
+    def dump_stats(self):
+        super().dump_stats()
+        print("Adaptive order per shape bucket:")
+        for bucket in sorted(self.buckets):
+            stats = self.buckets[bucket]
+            order = self.finder_order(bucket)
+            print("%s: order %s, successes %s/%s" % (bucket, order,
+                stats[:, self._SUCCESSES].astype(int).tolist(), stats[:, self._ATTEMPTS].astype(int).tolist()))
 
 class TrivialMoveFinder(UniformMoveFinder):
     def move_distribution(self, move_space):
@@ -76,6 +169,12 @@ class NoisyMoveFinder(UniformMoveFinder):
     def name(self):
         return "NoisyMoveFinder(%s)" % (self.finder.name(), )
 
+    def close(self):
+        self.finder.close()
+
+    def dump_stats(self):
+        self.finder.dump_stats()
+
     def move_distribution(self, move_space):
         noise = (numpy.random.rand(*move_space.shape)*(self._gen_noise*2)) - self._gen_noise
         return self.finder.move_distribution(move_space+noise)
@@ -89,6 +188,12 @@ class ConditionalFinder(UniformMoveFinder):
     def name(self):
         return "ConditionalFinder(%s)" % (self.finder.name(), )
 
+    def close(self):
+        self.finder.close()
+
+    def dump_stats(self):
+        self.finder.dump_stats()
+
     def move_distribution(self, move_space):
         shape = move_space.shape
         if move_space.size >= self.min_size and shape[0] >= self.min_dim and shape[1] >= self.min_dim:
@@ -102,6 +207,12 @@ class DebugFinder(UniformMoveFinder):
     def name(self):
         return self.finder.name()
 
+    def close(self):
+        self.finder.close()
+
+    def dump_stats(self):
+        self.finder.dump_stats()
+
     def move_distribution(self, move_space):
         try:
             #print(self.finder.name(), " finding for shape ", move_space.shape)
@@ -118,6 +229,86 @@ class DebugFinder(UniformMoveFinder):
         #print(self.finder.name(), " could not generate move for state:\n", move_space)
         print(self.finder.name(), " could not generate move for state: ", move_space.shape)
 
+def _timeout_worker(finder, conn):
+    while True:
+        try:
+            move_space = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, finder.move_distribution(move_space)))
+        except Exception as e:
+            conn.send((False, "%s: %s" % (e.__class__.__name__, e)))
+
+class TimeoutFinder(UniformMoveFinder):
+    # Solves in a reusable worker process. A solve exceeding the timeout
+    # kills the worker, is logged to the replay file and counts as failed.
+    def __init__(self, finder, timeout=60, replay_file=None):
+        self.finder = finder
+        self.timeout = timeout
+        self.replay_file = replay_file
+        self._proc = None
+        self._conn = None
+
+        self.solves = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    def name(self):
+        return "Timeout(%s)" % (self.finder.name(), )
+
+    def _start(self):
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._proc = multiprocessing.Process(target=_timeout_worker, args=(self.finder, child_conn), daemon=True)
+        self._proc.start()
+        child_conn.close()
+
+    def _stop(self):
+        if self._proc is None:
+            return
+        self._conn.close()
+        self._proc.terminate()
+        self._proc.join()
+        self._proc = None
+        self._conn = None
+
+    def _log_replay(self, move_space):
+        if not self.replay_file:
+            return
+        data = {"finder": self.finder.name(), "timeout": self.timeout, "move_space": numpy.asarray(move_space).tolist()}
+        with open(self.replay_file, "a") as f:
+            f.write(json.dumps(data))
+            f.write("\n")
+
+    def move_distribution(self, move_space):
+        if self._proc is None or not self._proc.is_alive():
+            self._stop()
+            self._start()
+        self.solves += 1
+        self._conn.send(move_space)
+        if not self._conn.poll(self.timeout):
+            self.timeouts += 1
+            print(self.finder.name(), " timed out after ", self.timeout, "s for state: ", move_space.shape)
+            self._log_replay(move_space)
+            self._stop()
+            return None
+        try:
+            ok, result = self._conn.recv()
+        except EOFError:
+            self.crashes += 1
+            print(self.finder.name(), " worker died for state: ", move_space.shape)
+            self._stop()
+            return None
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def close(self):
+        self._stop()
+        self.finder.close()
+
+    def dump_stats(self):
+        print("%s solves: %s, timeouts: %s, crashes: %s" % (self.name(), self.solves, self.timeouts, self.crashes))
 
 
 class NashSupportFinder(UniformMoveFinder):
@@ -245,6 +436,87 @@ class SpaceReducer(UniformMoveFinder):
         print("Space reducer dropped ", (self._rows_dropped, self._cols_dropped), " with runs: ", self._execs, " iterations: ", self._iterations)
         self.finder.dump_stats()
 
+    def close(self):
+        self.finder.close()
+
+class CachingFinder(UniformMoveFinder):
+    # Solutions are keyed on the bytes and shape of the (reduced) move space,
+    # kept in a bounded LRU and optionally in a shelve file on disk.
+    def __init__(self, finder, max_entries=20000, filename=None):
+        self.finder = finder
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.store = None
+        if filename:
+            self.store = shelve.open(filename)
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def name(self):
+        return "Cache(%s)" % (self.finder.name(), )
+
+    def _key(self, move_space):
+        data = numpy.ascontiguousarray(move_space, dtype="float32")
+        digest = hashlib.sha1(repr(data.shape).encode())
+        digest.update(data.tobytes())
+        return digest.hexdigest()
+
+    def _remember(self, key, moves):
+        self.cache[key] = moves
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+            self._evictions += 1
+
+    def _copy(self, moves):
+        return numpy.array(moves[0]), numpy.array(moves[1])
+
+    def _lookup(self, key):
+        if key in self.cache:
+            self._hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if self.store is not None and key in self.store:
+            self._disk_hits += 1
+            moves = self._copy(self.store[key])
+            self._remember(key, moves)
+            return moves
+
+    def move_distribution(self, move_space):
+        key = self._key(move_space)
+        moves = self._lookup(key)
+        if moves is not None:
+            return self._copy(moves)
+        self._misses += 1
+        moves = self.finder.move_distribution(move_space)
+        if not moves:
+            return moves
+        moves = self._copy(moves)
+        self._remember(key, moves)
+        if self.store is not None:
+            self.store[key] = (moves[0].tolist(), moves[1].tolist())
+        return self._copy(moves)
+
+    def hit_rate(self):
+        lookups = self._hits + self._disk_hits + self._misses
+        if lookups == 0:
+            return 0.0
+        return (self._hits + self._disk_hits) / lookups
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        self.finder.close()
+
+    def dump_stats(self):
+        print("Cache hits: %s (disk %s), misses: %s, hit rate: %s%%, entries: %s, evictions: %s" % (
+            self._hits, self._disk_hits, self._misses, round(100*self.hit_rate(), 1), len(self.cache), self._evictions))
+        self.finder.dump_stats()
+
 class MinimizeApproxFinder(UniformMoveFinder):
     def __init__(self, err=1e-10):
         self.err = err
@@ -295,13 +567,24 @@ class OptimizationCalculator(object):
         return res
 
 
-def create():
-    nash_sup = DebugFinder(NashSupportFinder())
-    return SpaceReducer(SequentialMoveFinder(
+def create(adaptive=False, cache_size=20000, cache_file=None, timeout=None, replay_file=None):
+    def guarded(finder):
+        if timeout:
+            return TimeoutFinder(finder, timeout, replay_file)
+        return finder
+    nash_sup = DebugFinder(guarded(NashSupportFinder()))
+    solvers = (
             TrivialMoveFinder(),
-            ConditionalFinder(DebugFinder(NoisyMoveFinder(NashHowsonFinder()))),
+            ConditionalFinder(DebugFinder(guarded(NoisyMoveFinder(NashHowsonFinder())))),
             MinimizeApproxFinder(),
-            ConditionalFinder(DebugFinder(NashVertexFinder())),
+            ConditionalFinder(DebugFinder(guarded(NashVertexFinder()))),
             nash_sup,
-            NoisyMoveFinder(nash_sup),
-            UniformMoveFinder(verbose=True)))
+            NoisyMoveFinder(nash_sup))
+    if adaptive:
+        finder = AdaptiveMoveFinder(*solvers)
+    else:
+        finder = SequentialMoveFinder(*solvers)
+    if cache_size or cache_file:
+        # the uniform placeholder stays outside so it is never cached
+        finder = CachingFinder(finder, max_entries=cache_size, filename=cache_file)
+    return SpaceReducer(SequentialMoveFinder(finder, UniformMoveFinder(verbose=True)))
@@ -0,0 +1,247 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from general import tablebase, equilibriumfinder
+
+# A build directory holds plan.json plus one file per shard, moving from
+# tasks/ (pending) to claimed/ (being built) with the result in done/.
+# The mtime of a claimed file is the worker's heartbeat, claims that stop
+# beating are moved back to tasks/.
+_TASKS = "tasks"
+_CLAIMED = "claimed"
+_DONE = "done"
+
+
+def shard_id(home_score, away_score, first_piece):
+    return "%02d_%02d_%04d" % (-home_score, -away_score, first_piece)
+
+
+def layer_deps(home_score, away_score):
+    # score layers reachable by winning one round, normalized so home leads
+    deps = []
+    if home_score + 1 < 0:
+        deps.append((home_score + 1, away_score))
+    if away_score + 1 < 0:
+        layer = (max(home_score, away_score + 1), min(home_score, away_score + 1))
+        if layer not in deps:
+            deps.append(layer)
+    return deps
+
+
+class ShardCoordinator(object):
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _write_json(self, data, *parts):
+        tmp = self._path(*parts) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.rename(tmp, self._path(*parts))
+
+    def _used_files(self):
+        used = [self._path("plan.json")] if os.path.exists(self._path("plan.json")) else []
+        for sub in (_TASKS, _CLAIMED, _DONE):
+            used.extend(self._path(sub, name) for name in os.listdir(self._path(sub)))
+        return used
+
+    def plan(self, max_pieces, win_depth, piece_step=25, clear=False):
+        # shard ids do not encode the build size, so old shards must never be reused
+        for sub in (_TASKS, _CLAIMED, _DONE):
+            os.makedirs(self._path(sub), exist_ok=True)
+        used = self._used_files()
+        if used and not clear:
+            raise ValueError("%s already holds a build (%s files), clear it before planning" % (self.directory, len(used)))
+        for filename in used:
+            os.remove(filename)
+        layer_shards = {}
+        tasks = []
+        for home_score in range(-1, -win_depth-1, -1):
+            for away_score in range(home_score, -win_depth-1, -1):
+                shards = []
+                for first in range(0, max_pieces+1, piece_step):
+                    deps = list(shards)
+                    for layer in layer_deps(home_score, away_score):
+                        deps.extend(layer_shards[layer])
+                    task = {
+                        "id": shard_id(home_score, away_score, first),
+                        "home_score": home_score,
+                        "away_score": away_score,
+                        "pieces": [first, min(first+piece_step, max_pieces+1)],
+                        "max_pieces": max_pieces,
+                        "win_depth": win_depth,
+                        "deps": deps,
+                    }
+                    shards.append(task["id"])
+                    tasks.append(task)
+                layer_shards[(home_score, away_score)] = shards
+        for task in tasks:
+            self._write_json(task, _TASKS, task["id"] + ".json")
+        self._write_json({"max_pieces": max_pieces, "win_depth": win_depth,
+            "shards": [t["id"] for t in tasks]}, "plan.json")
+        return tasks
+
+    def read_plan(self):
+        with open(self._path("plan.json"), "r") as f:
+            return json.load(f)
+
+    def missing(self):
+        return [s for s in self.read_plan()["shards"] if not os.path.exists(self._path(_DONE, s + ".txt"))]
+
+    def requeue_stale(self, claim_timeout):
+        requeued = []
+        now = time.time()
+        for name in os.listdir(self._path(_CLAIMED)):
+            try:
+                if now - os.path.getmtime(self._path(_CLAIMED, name)) < claim_timeout:
+                    continue
+                os.rename(self._path(_CLAIMED, name), self._path(_TASKS, name))
+            except FileNotFoundError:
+                continue
+            requeued.append(name[:-len(".json")])
+        return requeued
+
+    def merge(self, table, filename=None):
+        missing = self.missing()
+        if missing:
+            raise ValueError("Can not merge, %s shards are not done: %s" % (len(missing), missing[:5]))
+        table_io = tablebase.TableIO()
+        for shard in self.read_plan()["shards"]:
+            table_io.load(table, self._path(_DONE, shard + ".txt"))
+        if filename:
+            table_io.save(table, filename)
+        return table
+
+
+class ShardWorker(object):
+    def __init__(self, directory, eq_engine, poll=1.0, claim_timeout=600):
+        self.directory = directory
+        self.eq_engine = eq_engine
+        self.poll = poll
+        self.claim_timeout = claim_timeout
+        self.coordinator = ShardCoordinator(directory)
+        self.completed = []
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _is_done(self, shard):
+        return os.path.exists(self._path(_DONE, shard + ".txt"))
+
+    def _claim(self):
+        for name in sorted(os.listdir(self._path(_TASKS))):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(self._path(_TASKS, name), "r") as f:
+                    task = json.load(f)
+            except FileNotFoundError:
+                continue
+            if not all(self._is_done(dep) for dep in task["deps"]):
+                continue
+            try:
+                # rename is atomic, so only one worker can win the claim
+                os.rename(self._path(_TASKS, name), self._path(_CLAIMED, name))
+            except FileNotFoundError:
+                continue
+            if self._is_done(task["id"]):
+                # requeued after its first worker finished after all
+                self._remove_claim(task)
+                continue
+            self._heartbeat(task)
+            return task
+
+    def _claim_path(self, task):
+        return self._path(_CLAIMED, task["id"] + ".json")
+
+    def _heartbeat(self, task):
+        try:
+            os.utime(self._claim_path(task))
+        except FileNotFoundError:
+            pass
+
+    def _remove_claim(self, task):
+        try:
+            os.remove(self._claim_path(task))
+        except FileNotFoundError:
+            pass
+
+    def _release(self, task):
+        name = task["id"] + ".json"
+        try:
+            os.rename(self._path(_CLAIMED, name), self._path(_TASKS, name))
+        except FileNotFoundError:
+            pass
+
+    def _beat_until(self, task, stop):
+        while not stop.wait(self.claim_timeout / 4.0):
+            self._heartbeat(task)
+
+    def build(self, task):
+        table = tablebase.TableBase(self.eq_engine, task["win_depth"])
+        table_io = tablebase.TableIO()
+        for dep in task["deps"]:
+            table_io.load(table, self._path(_DONE, dep + ".txt"))
+        shard = tablebase.TableBase(None, task["win_depth"])
+        home_range = range(*task["pieces"])
+        print("Filling shard %s" % (task["id"], ))
+        filled = tablebase.TableBuilder(table).fill_range(
+                task["home_score"], task["away_score"], task["max_pieces"], home_range)
+        for state, prob in filled:
+            shard.put(state, prob)
+        tmp = self._path(_DONE, "%s.txt.%s.tmp" % (task["id"], os.getpid()))
+        table_io.save(shard, tmp)
+        os.rename(tmp, self._path(_DONE, task["id"] + ".txt"))
+        self._remove_claim(task)
+
+    def _wait_for_plan(self):
+        # plan.json is written after every task, so its presence means the queue is complete
+        while not os.path.exists(self._path("plan.json")):
+            time.sleep(self.poll)
+
+    def run(self):
+        self._wait_for_plan()
+        while True:
+            task = self._claim()
+            if task is None:
+                if not self.coordinator.missing():
+                    return self.completed
+                self.coordinator.requeue_stale(self.claim_timeout)
+                time.sleep(self.poll)
+                continue
+            stop = threading.Event()
+            beat = threading.Thread(target=self._beat_until, args=(task, stop), daemon=True)
+            beat.start()
+            try:
+                self.build(task)
+            except BaseException:
+                self._release(task)
+                raise
+            finally:
+                stop.set()
+                beat.join()
+            self.completed.append(task["id"])
+
+
+def run_worker(directory, finder_args=None, poll=1.0, claim_timeout=600):
+    eq_engine = equilibriumfinder.create(**(finder_args or {}))
+    try:
+        return ShardWorker(directory, eq_engine, poll, claim_timeout).run()
+    finally:
+        eq_engine.close()
+
+
+def build_local(directory, max_pieces, win_depth, workers=2, piece_step=25, finder_args=None, poll=0.1, clear=False):
+    coordinator = ShardCoordinator(directory)
+    coordinator.plan(max_pieces, win_depth, piece_step, clear)
+    procs = [multiprocessing.Process(target=run_worker, args=(directory, finder_args, poll))
+            for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return coordinator
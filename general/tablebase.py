@@ -8,15 +8,43 @@ class TableBase(object):
         self.win_condition = ge.WinCondition(win_at)
         self.norm_win_condition = ge.WinCondition(0)
         self.eq_engine = eq_engine
+        self.win_depth = 0
+        self.max_pieces = 0
 
     def put(self, state, prob):
         self.table[state] = prob
+        self.win_depth = max(self.win_depth, -state.away_wins, -state.home_wins)
+        self.max_pieces = max(self.max_pieces, state.home_pieces, state.away_pieces)
 
     def state_prob_pairs(self):
         return self.table.items()
 
+    def capabilities(self):
+        # scores are stored relative to the win condition, so a table built
+        # to depth N serves every first_to up to N
+        return {
+            "win_depth": self.win_depth,
+            "max_pieces": self.max_pieces,
+            "first_to": list(range(1, self.win_depth+1)),
+        }
+
+    def covers(self, first_to, pieces=None):
+        if pieces is not None and pieces > self.max_pieces:
+            return False
+        return 1 <= first_to <= self.win_depth
+
+    def with_win_condition(self, first_to, pieces=None):
+        if not self.covers(first_to, pieces):
+            raise ValueError("Table with win depth %s and %s pieces can not serve first_to=%s with %s pieces" % (
+                self.win_depth, self.max_pieces, first_to, pieces))
+        table = TableBase(self.eq_engine, first_to)
+        table.table = self.table
+        table.win_depth = self.win_depth
+        table.max_pieces = self.max_pieces
+        return table
+
     def lookup(self, state):
-        return self._lookup_norm(self.win_condition.normalize(state))
+        return self._lookup_win_norm(self.win_condition.normalize(state))
 
     def _lookup_win_norm(self, state):
         won = self.norm_win_condition.winner(state)
@@ -65,9 +93,13 @@ class TableBase(object):
         prob = self._dist_win_chance(move_space, home_dist, away_dist)
         print("\nSpace:\n%s\nhome_dist: %s\naway_dist: %s\nprob: %s" % (move_space, home_dist, away_dist, prob))
 
-    def comment_moves(self, state, home_move, away_move):
+    def equilibrium(self, state):
         move_space = self.calc_move_space(state, compress=False)
         home_dist, away_dist = self.eq_engine.move_distribution(move_space)
+        return move_space, home_dist, away_dist
+
+    def comment_moves(self, state, home_move, away_move):
+        move_space, home_dist, away_dist = self.equilibrium(state)
         prev_prob = self._percent(self._dist_win_chance(move_space, home_dist, away_dist))
         new_prob = self._percent(self.calc_winchance(state.move(home_move, away_move)))
         exp_home = self._expected_win(move_space, home_move, away_dist)
@@ -121,14 +153,27 @@ class TableBuilder(object):
     def __init__(self, table):
         self.table = table
 
-    def _gen_for_score(self, home_score, away_score, max_pieces):
+    def _away_range(self, home_score, away_score, home_pieces, max_pieces):
+        if home_score == away_score:
+            return range(0, home_pieces+1)
+        return range(0, max_pieces+1)
+
+    def _won_before(self, home_score, away_score, home_pieces, max_pieces):
+        # whether an already filled row with fewer home pieces is won for every away move
+        for i in range(0, home_pieces):
+            away_range = self._away_range(home_score, away_score, i, max_pieces)
+            if all(self.table.table[ge.State(ge.PlayerState(i, home_score), ge.PlayerState(j, away_score))] >= 1 for j in away_range):
+                return True
+        return False
+
+    def _gen_for_score(self, home_score, away_score, max_pieces, home_range=None):
+        if home_range is None:
+            home_range = range(0, max_pieces+1)
         prog_msg = "%s:%s" % (home_score, away_score) + ": filled %s"
-        progress = ProgressUpdater(max_pieces**2, prog_msg)
-        complete_winner = False
-        for i in range(0, max_pieces+1):
-            away_range = range(0, max_pieces+1)
-            if home_score == away_score:
-                away_range = range(0, i+1)
+        progress = ProgressUpdater(len(home_range)*(max_pieces+1), prog_msg)
+        complete_winner = self._won_before(home_score, away_score, home_range[0], max_pieces)
+        for i in home_range:
+            away_range = self._away_range(home_score, away_score, i, max_pieces)
             away_could_win = False
             for j in away_range:
                 home = ge.PlayerState(i,home_score)
@@ -145,9 +190,15 @@ class TableBuilder(object):
             if not away_could_win:
                 complete_winner = True
 
-    def _fill_for_score(self, home_score, away_score, max_pieces):
-        for state, prob in self._gen_for_score(home_score, away_score, max_pieces):
+    def _fill_for_score(self, home_score, away_score, max_pieces, home_range=None):
+        filled = []
+        for state, prob in self._gen_for_score(home_score, away_score, max_pieces, home_range):
             self.table.put(state, prob)
+            filled.append((state, prob))
+        return filled
+
+    def fill_range(self, home_score, away_score, max_pieces, home_range):
+        return self._fill_for_score(home_score, away_score, max_pieces, home_range)
 
     def fill_instructions(self, home_score, away_score, max_pieces):
         for state, prob in self._gen_for_score(home_score, away_score, max_pieces):
@@ -162,16 +213,31 @@ class TableBuilder(object):
 
 
 class TableIO(object):
+    FORMAT = 1
+
     def __init__(self):
         pass
 
+    def _header(self, table):
+        header = {"format": self.FORMAT}
+        header.update(table.capabilities())
+        return header
+
     def save(self, table, filename):
         with open(filename, "w") as f:
+            f.write(json.dumps(self._header(table)))
+            f.write("\n")
             for state, prob in table.state_prob_pairs():
                 data = [state.home_wins, state.home_pieces, state.away_wins, state.away_pieces, prob]
                 f.write(json.dumps(data))
                 f.write("\n")
 
+    def read_header(self, filename):
+        with open(filename, "r") as f:
+            data = json.loads(f.readline() or "null")
+        if isinstance(data, dict):
+            return data
+
     def load(self, table, filename):
         with open(filename, "r") as f:
             while True:
@@ -179,10 +245,17 @@ class TableIO(object):
                 if not line:
                     return
                 data = json.loads(line)
+                if isinstance(data, dict):
+                    self._check_header(data, filename)
+                    continue
                 home = ge.PlayerState(data[1], data[0])
                 away = ge.PlayerState(data[3], data[2])
                 table.put(ge.State(home, away), data[-1])
 
+    def _check_header(self, header, filename):
+        if header.get("format", self.FORMAT) > self.FORMAT:
+            raise ValueError("%s has unsupported table format %s" % (filename, header["format"]))
+
 
 class TablePlayer(object):
     def __init__(self, table):
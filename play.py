@@ -18,6 +18,8 @@ parser.add_argument('-a', '--away', choices=(_HUMAN, _CPU), default=_CPU)
 parser.add_argument('-p', '--pieces', type=int, default=100)
 parser.add_argument('-w', '--wins', type=int, default=3)
 parser.add_argument('-s', '--stats', action="store_true")
+parser.add_argument('-t', '--table-file', default="states.txt")
+parser.add_argument('-c', '--cache-file', help="reuse move spaces solved by earlier runs")
 args = parser.parse_args()
 
 def play_game(game, home_player, away_player, table, stats):
@@ -36,9 +38,10 @@ def play_game(game, home_player, away_player, table, stats):
 
 game = gameengine.Game.create(win_at=args.wins, pieces=args.pieces)
 
-eq_finder = equilibriumfinder.create()
-table = tablebase.TableBase(eq_finder, 3)
-tablebase.TableIO().load(table, "states.txt")
+eq_finder = equilibriumfinder.create(cache_file=args.cache_file)
+table = tablebase.TableBase(eq_finder)
+tablebase.TableIO().load(table, args.table_file)
+table = table.with_win_condition(args.wins, args.pieces)
 
 def _create_player(player_type, table):
     if player_type == _CPU:
@@ -48,4 +51,4 @@ def _create_player(player_type, table):
 home = _create_player(args.home, table)
 away = _create_player(args.away, table)
 play_game(game, home, away, table, args.stats)
-
+eq_finder.close()
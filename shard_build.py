@@ -0,0 +1,43 @@
+import argparse
+from general import sharding, tablebase
+
+parser = argparse.ArgumentParser(prog="Generals", description="sharded generals tablebase build")
+parser.add_argument('directory', help="build directory shared between coordinator and workers")
+sub = parser.add_subparsers(dest="command", required=True)
+plan = sub.add_parser("plan", help="write shard tasks")
+plan.add_argument('-p', '--pieces', type=int, default=100)
+plan.add_argument('-w', '--wins', type=int, default=3)
+plan.add_argument('--step', type=int, default=25, help="home pieces per shard")
+plan.add_argument('--clear', action="store_true", help="remove tasks and results of an earlier plan")
+work = sub.add_parser("work", help="claim and build shards until none are left")
+work.add_argument('--poll', type=float, default=1.0)
+work.add_argument('--claim-timeout', type=float, default=600, help="seconds without heartbeat before a claim is requeued")
+requeue = sub.add_parser("requeue", help="move claims without a recent heartbeat back to the queue")
+requeue.add_argument('--claim-timeout', type=float, default=600)
+merge = sub.add_parser("merge", help="merge finished shards into one table file")
+merge.add_argument('-s', '--save-file', default="states.txt")
+local = sub.add_parser("local", help="plan, build with local worker processes and merge")
+local.add_argument('-p', '--pieces', type=int, default=100)
+local.add_argument('-w', '--wins', type=int, default=3)
+local.add_argument('--step', type=int, default=25, help="home pieces per shard")
+local.add_argument('-j', '--workers', type=int, default=2)
+local.add_argument('-s', '--save-file', default="states.txt")
+local.add_argument('--clear', action="store_true", help="remove tasks and results of an earlier plan")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    coordinator = sharding.ShardCoordinator(args.directory)
+    if args.command == "plan":
+        tasks = coordinator.plan(args.pieces, args.wins, args.step, args.clear)
+        print("Planned %s shards in %s" % (len(tasks), args.directory))
+    elif args.command == "work":
+        done = sharding.run_worker(args.directory, poll=args.poll, claim_timeout=args.claim_timeout)
+        print("Built %s shards" % (len(done), ))
+    elif args.command == "requeue":
+        requeued = coordinator.requeue_stale(args.claim_timeout)
+        print("Requeued %s stale shards" % (len(requeued), ))
+    elif args.command == "merge":
+        coordinator.merge(tablebase.TableBase(None), args.save_file)
+    elif args.command == "local":
+        coordinator = sharding.build_local(args.directory, args.pieces, args.wins, args.workers, args.step, clear=args.clear)
+        coordinator.merge(tablebase.TableBase(None), args.save_file)
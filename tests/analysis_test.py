@@ -0,0 +1,75 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+import numpy
+from general import analysis, equilibriumfinder, gameengine as ge, tablebase
+
+
+class GameLogAnalyzerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.table = tablebase.TableBase(equilibriumfinder.create(), 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tablebase.TableBuilder(cls.table).fill_to_pieces(4, 2)
+
+    def test_deduplicates_states(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        games = [(4, [[2, 1], [1, 2]]), (4, [[2, 1], [2, 0]])]
+        columns = analyzer.analyze(games)
+        self.assertEqual(len(columns["turn"]), 4)
+        self.assertEqual(analyzer.solves, 2, "states shared between games should be solved once")
+
+    def test_win_delta_matches_table(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        columns = analyzer.analyze([(4, [[2, 1], [0, 3]])])
+        after_first = columns["win_before"][1]
+        self.assertAlmostEqual(columns["win_after"][0], after_first, 3)
+        numpy.testing.assert_allclose(columns["win_delta"], columns["win_after"] - columns["win_before"])
+        self.assertAlmostEqual(columns["win_before"][0], 0.5, 3, "symmetric start is even")
+
+    def test_pass_move_keeps_win_chance(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        columns = analyzer.analyze([(4, [[1, 0], [0, 0], [1, 1]])])
+        state = ge.State.initial(4).move(1, 0)
+        self.assertAlmostEqual(columns["win_after"][1], self.table.calc_winchance(state), 2)
+        self.assertEqual(columns["win_delta"][1], 0)
+
+    def test_stops_at_winner(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        columns = analyzer.analyze([(4, [[1, 0], [1, 0], [1, 0]])])
+        self.assertEqual(len(columns["turn"]), 2)
+
+    def test_illegal_move(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        with self.assertRaises(ValueError):
+            analyzer.analyze_game(0, [[5, 0]], 4)
+
+    def test_skips_bad_games(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        with contextlib.redirect_stdout(io.StringIO()):
+            columns = analyzer.analyze([(4, [[2, 1]]), (4, [[5, 0]]), (10, [[1, 1]]), (4, [[1, 2]])])
+        self.assertEqual(analyzer.skipped, [1, 2], "illegal move and uncovered game are skipped")
+        self.assertEqual(columns["game"].tolist(), [0, 3])
+
+    def test_expectancy_matches_move_space(self):
+        analyzer = analysis.GameLogAnalyzer(self.table)
+        state = ge.State.initial(4).move(2, 1)
+        move_space, home_dist, away_dist = self.table.equilibrium(state)
+        columns = analyzer.analyze([(4, [[2, 1], [1, 2]])])
+        self.assertAlmostEqual(columns["home_expected"][1], move_space[1, :].dot(away_dist), 2)
+        self.assertAlmostEqual(columns["away_expected"][1], 1 - home_dist.dot(move_space[:, 2]), 2)
+
+    def test_read_and_save(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, "games.txt")
+            with open(log, "w") as f:
+                f.write('[[2, 1]]\n{"pieces": 3, "moves": [[1, 1]]}\n')
+            games = list(analysis.GameLogReader(4).read(log))
+            self.assertEqual(games, [(4, [[2, 1]]), (3, [[1, 1]])])
+            analyzer = analysis.GameLogAnalyzer(self.table)
+            out = os.path.join(tmp, "out.csv")
+            analyzer.save(analyzer.analyze(games), out)
+            with open(out) as f:
+                self.assertEqual(len(f.readlines()), 3)
@@ -0,0 +1,41 @@
+import os
+import json
+import tempfile
+import unittest
+from general import benchmark
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_growth_exponent(self):
+        pieces = [2, 4, 8, 16]
+        exponent = benchmark.BuildBenchmark.growth_exponent(pieces, [p**2 for p in pieces])
+        self.assertAlmostEqual(exponent, 2.0, 6)
+        self.assertIsNone(benchmark.BuildBenchmark.growth_exponent([2], [4]), "needs two points to fit")
+
+    def test_small_sweep(self):
+        bench = benchmark.BuildBenchmark([1, 2], [1], isolate=False)
+        results = bench.run()
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertGreater(result["states"], 0)
+            self.assertGreater(result["file_bytes"], 0)
+            self.assertGreaterEqual(result["wall_s"], result["finder_s"])
+            self.assertIsNone(result["peak_rss_mb"], "peak rss is not per run in a shared process")
+        self.assertIn("wins=1", bench.report(results))
+
+    def test_replay_move_spaces(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            replay = os.path.join(tmp, "timeouts.txt")
+            with open(replay, "w") as f:
+                for name in ("NashVertexFinder", "NoisyMoveFinder(NashHowsonFinder)"):
+                    f.write(json.dumps({"finder": name, "timeout": 1, "move_space": [[0.5, 0.], [1., 0.5]]}) + "\n")
+            results = benchmark.replay_move_spaces(replay, timeout=30)
+        self.assertEqual([r["finder"] for r in results], ["NashVertexFinder", "NoisyMoveFinder(NashHowsonFinder)"])
+        self.assertEqual(results[0]["shape"], [2, 2])
+        self.assertTrue(all(r["solved"] and not r["timed_out"] for r in results))
+
+    def test_replay_finder(self):
+        finder = benchmark.replay_finder("NoisyMoveFinder(NashSupportFinder)")
+        self.assertEqual(finder.name(), "NoisyMoveFinder(NashSupportFinder)")
+        with self.assertRaises(ValueError):
+            benchmark.replay_finder("SequentialMoveFinder")
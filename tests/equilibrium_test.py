@@ -1,3 +1,9 @@
+import io
+import os
+import contextlib
+import json
+import time
+import tempfile
 import unittest
 import numpy
 from general import equilibriumfinder as ef
@@ -94,3 +100,137 @@ class EquilibriumTest(unittest.TestCase):
 
     def _prob(self, eq, ms):
         return float(eq[0].dot(ms).dot(eq[1].transpose()))
+
+
+class CountingFinder(ef.UniformMoveFinder):
+    def __init__(self, succeed):
+        super().__init__()
+        self.succeed = succeed
+        self.calls = 0
+
+    def move_distribution(self, move_space):
+        self.calls += 1
+        if self.succeed:
+            return super().move_distribution(move_space)
+
+
+class AdaptiveTest(unittest.TestCase):
+    def test_leads_with_successful_finder(self):
+        failing = CountingFinder(False)
+        working = CountingFinder(True)
+        finder = ef.AdaptiveMoveFinder(failing, working, min_samples=3, explore_every=1000)
+        move_space = numpy.zeros((3, 3))
+        for _ in range(10):
+            self.assertIsNotNone(finder.move_distribution(move_space))
+        self.assertEqual(failing.calls, 3, "failing finder should be skipped once sampled")
+        self.assertEqual(finder.finder_order((2, 2)), [1, 0])
+        self.assertEqual(finder.finder_order((3, 3)), [0, 1], "unseen shapes keep original order")
+
+    def test_fallback_never_leads(self):
+        solver = CountingFinder(False)
+        fallback = CountingFinder(True)
+        finder = ef.AdaptiveMoveFinder(solver, fallback=fallback, min_samples=3, explore_every=1000)
+        move_space = numpy.zeros((2, 2))
+        for _ in range(10):
+            finder.move_distribution(move_space)
+        solver.succeed = True
+        for _ in range(20):
+            finder.move_distribution(move_space)
+        self.assertEqual(fallback.calls, 10, "fallback should only answer when the solver fails")
+        self.assertEqual(finder.finder_order((2, 2)), [0, 1])
+
+    def test_falls_back_in_original_order(self):
+        first = CountingFinder(True)
+        second = CountingFinder(True)
+        finder = ef.AdaptiveMoveFinder(first, second, min_samples=2, explore_every=1000)
+        move_space = numpy.zeros((2, 2))
+        for _ in range(5):
+            finder.move_distribution(move_space)
+        first.succeed = False
+        self.assertIsNotNone(finder.move_distribution(move_space))
+        self.assertEqual(second.calls, 1, "fallback should reach the next finder")
+
+
+class CachingTest(unittest.TestCase):
+    def test_fallback_not_cached(self):
+        failing = CountingFinder(False)
+        finder = ef.SequentialMoveFinder(ef.CachingFinder(failing), ef.UniformMoveFinder())
+        for _ in range(2):
+            self.assertIsNotNone(finder.move_distribution(numpy.zeros((2, 2))))
+        self.assertEqual(failing.calls, 2, "unsolved spaces should be retried")
+
+    def test_reuses_solution(self):
+        inner = CountingFinder(True)
+        finder = ef.CachingFinder(inner, max_entries=2)
+        move_space = numpy.zeros((2, 3))
+        first = finder.move_distribution(move_space)
+        second = finder.move_distribution(move_space.copy())
+        self.assertEqual(inner.calls, 1, "identical move space should hit cache")
+        numpy.testing.assert_array_equal(first[1], second[1])
+        finder.move_distribution(numpy.zeros((3, 2)))
+        self.assertEqual(inner.calls, 2, "shape is part of the key")
+        self.assertAlmostEqual(finder.hit_rate(), 1/3)
+
+    def test_lru_eviction(self):
+        inner = CountingFinder(True)
+        finder = ef.CachingFinder(inner, max_entries=1)
+        finder.move_distribution(numpy.zeros((2, 2)))
+        finder.move_distribution(numpy.ones((2, 2)))
+        finder.move_distribution(numpy.zeros((2, 2)))
+        self.assertEqual(inner.calls, 3, "evicted entry should be solved again")
+
+    def test_disk_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "cache")
+            finder = ef.CachingFinder(CountingFinder(True), filename=filename)
+            finder.move_distribution(numpy.zeros((2, 2)))
+            finder.close()
+            inner = CountingFinder(True)
+            finder = ef.CachingFinder(inner, filename=filename)
+            self.assertIsNotNone(finder.move_distribution(numpy.zeros((2, 2))))
+            finder.close()
+            self.assertEqual(inner.calls, 0, "solution should be loaded from disk")
+
+
+class SleepingFinder(ef.UniformMoveFinder):
+    def __init__(self, sleep):
+        super().__init__()
+        self.sleep = sleep
+
+    def move_distribution(self, move_space):
+        if move_space.shape[0] > 2:
+            time.sleep(self.sleep)
+        return super().move_distribution(move_space)
+
+
+class TimeoutTest(unittest.TestCase):
+    def test_stats_reported_through_create(self):
+        finder = ef.create(timeout=5)
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                finder.move_distribution(numpy.array([[0.5, 0., 1.], [1., 0.5, 0.], [0., 1., 0.5]]))
+                finder.dump_stats()
+        finally:
+            finder.close()
+        self.assertIn("Timeout(NashVertexFinder) solves:", out.getvalue())
+        self.assertIn("timeouts: 0", out.getvalue())
+
+    def test_timeout_falls_through(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            replay = os.path.join(tmp, "timeouts.txt")
+            guarded = ef.TimeoutFinder(SleepingFinder(30), timeout=0.5, replay_file=replay)
+            fallback = CountingFinder(True)
+            finder = ef.SequentialMoveFinder(guarded, fallback)
+            try:
+                self.assertIsNotNone(finder.move_distribution(numpy.zeros((3, 3))))
+                self.assertEqual(fallback.calls, 1, "timed out solve should fall through")
+                self.assertEqual(guarded.timeouts, 1)
+                eq = guarded.move_distribution(numpy.zeros((2, 2)))
+                self.assertIsNotNone(eq, "worker should be respawned after a timeout")
+            finally:
+                finder.close()
+            with open(replay) as f:
+                logged = [json.loads(line) for line in f]
+            self.assertEqual(len(logged), 1)
+            self.assertEqual(numpy.asarray(logged[0]["move_space"]).shape, (3, 3))
@@ -0,0 +1,96 @@
+import io
+import os
+import time
+import tempfile
+import threading
+import unittest
+import contextlib
+from general import equilibriumfinder, sharding, tablebase
+
+
+def build_states(pieces, wins):
+    table = tablebase.TableBase(equilibriumfinder.create(), wins)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tablebase.TableBuilder(table).fill_to_pieces(pieces, wins)
+    return table.table
+
+
+class ShardingTest(unittest.TestCase):
+    def test_layer_deps(self):
+        self.assertEqual(sharding.layer_deps(-1, -1), [])
+        self.assertEqual(sharding.layer_deps(-1, -2), [(-1, -1)])
+        self.assertEqual(sharding.layer_deps(-2, -2), [(-1, -2)])
+        self.assertEqual(sharding.layer_deps(-2, -3), [(-1, -3), (-2, -2)])
+
+    def test_plan_deps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tasks = sharding.ShardCoordinator(tmp).plan(5, 2, piece_step=3)
+            self.assertEqual(len(tasks), 6)
+            by_id = dict((t["id"], t) for t in tasks)
+            self.assertEqual(by_id["01_01_0003"]["deps"], ["01_01_0000"])
+            self.assertEqual(by_id["02_02_0000"]["deps"], ["01_02_0000", "01_02_0003"])
+            self.assertEqual(tasks[-1]["pieces"], [3, 6])
+
+    def test_local_build_matches_sequential(self):
+        table = tablebase.TableBase(equilibriumfinder.create(), 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tablebase.TableBuilder(table).fill_to_pieces(5, 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                coordinator = sharding.build_local(tmp, 5, 2, workers=2, piece_step=2)
+            self.assertEqual(coordinator.missing(), [])
+            merged = coordinator.merge(tablebase.TableBase(None), os.path.join(tmp, "states.txt"))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "states.txt")))
+        self.assertEqual(set(merged.table), set(table.table))
+        for state, prob in table.state_prob_pairs():
+            self.assertAlmostEqual(merged.table[state], prob, delta=0.01, msg=str(state))
+
+    def test_stale_claim_is_requeued(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            coordinator = sharding.ShardCoordinator(tmp)
+            coordinator.plan(3, 1, piece_step=2)
+            # a worker that died right after claiming the first shard
+            claimed = os.path.join(tmp, "claimed", "01_01_0000.json")
+            os.rename(os.path.join(tmp, "tasks", "01_01_0000.json"), claimed)
+            stale = time.time() - 60
+            os.utime(claimed, (stale, stale))
+            worker = sharding.ShardWorker(tmp, equilibriumfinder.create(), poll=0.01, claim_timeout=30)
+            with contextlib.redirect_stdout(io.StringIO()):
+                done = worker.run()
+            self.assertIn("01_01_0000", done)
+            self.assertEqual(coordinator.missing(), [])
+            self.assertEqual(os.listdir(os.path.join(tmp, "claimed")), [])
+
+    def test_fresh_claim_is_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            coordinator = sharding.ShardCoordinator(tmp)
+            coordinator.plan(3, 1, piece_step=2)
+            os.rename(os.path.join(tmp, "tasks", "01_01_0000.json"), os.path.join(tmp, "claimed", "01_01_0000.json"))
+            self.assertEqual(coordinator.requeue_stale(30), [])
+            self.assertEqual(coordinator.requeue_stale(0), ["01_01_0000"])
+
+    def test_worker_waits_for_plan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, "build")
+            worker = sharding.ShardWorker(directory, equilibriumfinder.create(), poll=0.01)
+            result = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                thread = threading.Thread(target=lambda: result.append(worker.run()))
+                thread.start()
+                time.sleep(0.1)
+                self.assertTrue(thread.is_alive(), "worker should wait for the plan")
+                sharding.ShardCoordinator(directory).plan(3, 1, piece_step=2)
+                thread.join(30)
+            self.assertEqual(sorted(result[0]), ["01_01_0000", "01_01_0002"])
+
+    def test_replan_into_used_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                sharding.build_local(tmp, 3, 2, workers=1, piece_step=2)
+                coordinator = sharding.ShardCoordinator(tmp)
+                with self.assertRaises(ValueError):
+                    coordinator.plan(5, 2, piece_step=2)
+                sharding.build_local(tmp, 5, 2, workers=1, piece_step=2, clear=True)
+            merged = coordinator.merge(tablebase.TableBase(None))
+        self.assertEqual(merged.capabilities()["max_pieces"], 5)
+        self.assertEqual(len(merged.table), len(build_states(5, 2)))
@@ -0,0 +1,67 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+import contextlib
+from general import equilibriumfinder, gameengine as ge, tablebase
+
+
+def build(pieces, wins):
+    table = tablebase.TableBase(equilibriumfinder.create(), wins)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tablebase.TableBuilder(table).fill_to_pieces(pieces, wins)
+    return table
+
+
+class TableBaseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.table = build(4, 3)
+
+    def test_capabilities(self):
+        caps = self.table.capabilities()
+        self.assertEqual(caps["win_depth"], 3)
+        self.assertEqual(caps["max_pieces"], 4)
+        self.assertEqual(caps["first_to"], [1, 2, 3])
+        self.assertTrue(self.table.covers(2, 3))
+        self.assertFalse(self.table.covers(4))
+        self.assertFalse(self.table.covers(2, 5))
+
+    def test_serves_smaller_win_condition(self):
+        shallow = build(4, 2)
+        served = self.table.with_win_condition(2, 3)
+        self.assertIs(served.table, self.table.table, "views share the loaded table")
+        for state in (ge.State.initial(3), ge.State.initial(4), ge.State.initial(4).move(2, 1)):
+            self.assertAlmostEqual(served.calc_winchance(state), shallow.calc_winchance(state), delta=0.01)
+        self.assertEqual(served.lookup(ge.State.initial(4)), 0.5)
+
+    def test_rejects_uncovered(self):
+        with self.assertRaises(ValueError):
+            self.table.with_win_condition(4)
+        with self.assertRaises(ValueError):
+            self.table.with_win_condition(2, 10)
+
+    def test_header_roundtrip(self):
+        table_io = tablebase.TableIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "states.txt")
+            table_io.save(self.table, filename)
+            header = table_io.read_header(filename)
+            self.assertEqual(header["first_to"], [1, 2, 3])
+            self.assertEqual(header["max_pieces"], 4)
+            loaded = tablebase.TableBase(None)
+            table_io.load(loaded, filename)
+            self.assertEqual(loaded.table, self.table.table)
+            self.assertEqual(loaded.capabilities(), self.table.capabilities())
+
+    def test_load_without_header(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "states.txt")
+            with open(filename, "w") as f:
+                f.write(json.dumps([-1, 1, -2, 0, 1.0]) + "\n")
+            table_io = tablebase.TableIO()
+            self.assertIsNone(table_io.read_header(filename))
+            loaded = tablebase.TableBase(None)
+            table_io.load(loaded, filename)
+            self.assertEqual(loaded.capabilities()["win_depth"], 2)
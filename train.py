@@ -5,9 +5,16 @@ parser = argparse.ArgumentParser(prog="Generals", description="fill generals tab
 parser.add_argument('-p', '--pieces', type=int, default=100)
 parser.add_argument('-w', '--wins', type=int, default=3)
 parser.add_argument('-s', '--save-file', default="states.txt")
+parser.add_argument('-a', '--adaptive', action="store_true", help="reorder finders by observed cost per shape")
+parser.add_argument('-c', '--cache-file', help="persist solved move spaces to this file")
+parser.add_argument('-t', '--timeout', type=float, help="kill nash solves running longer than this many seconds")
+parser.add_argument('-r', '--replay-file', default="timeouts.txt", help="log move spaces that timed out")
 args = parser.parse_args()
 
-eq_finder = equilibriumfinder.create()
+eq_finder = equilibriumfinder.create(adaptive=args.adaptive, cache_file=args.cache_file,
+        timeout=args.timeout, replay_file=args.replay_file)
 table = tablebase.TableBase(eq_finder, args.wins)
 tablebase.TableBuilder(table).fill_to_pieces(args.pieces, args.wins)
 tablebase.TableIO().save(table, "states.txt")
+eq_finder.dump_stats()
+eq_finder.close()